@@ -1,13 +1,44 @@
 
 import os
-import random
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
 st.set_page_config(page_title="MCQ Quiz", layout="wide")
 
+REQUIRED = ["No", "Question", "A", "B", "C", "D", "Correct"]
+_REQUIRED_SET = frozenset(REQUIRED)
+
+def _keep_col(name) -> bool:
+    """usecols filter: skip columns the app never reads at the parser level."""
+    return str(name).replace("\ufeff", "").strip() in _REQUIRED_SET
+
+try:
+    from charset_normalizer import from_bytes as _cn_from_bytes  # optional: C-backed detector
+except ImportError:
+    _cn_from_bytes = None
+
+def _sniff_encoding(path: Path) -> str:
+    """Detect the file encoding once from the head instead of trial-parsing the whole file."""
+    with open(path, "rb") as f:
+        head = f.read(65536)
+    # BOM short-circuits
+    if head[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return "utf-16"
+    if head[:3] == b"\xef\xbb\xbf":
+        return "utf-8-sig"
+    if _cn_from_bytes is not None:
+        best = _cn_from_bytes(head).best()
+        if best is not None and best.encoding:
+            return best.encoding
+    try:  # a multi-byte char may sit on the 64 KB boundary
+        head[:head.rfind(b"\n") if b"\n" in head else len(head)].decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin1"
+
 # ==================================
 # Data Loading (robust & friendly)
 # ==================================
@@ -25,24 +56,36 @@ def load_questions(base_name: str = "questions"):
     df = None
     errors = []
 
-    # Try CSV first with tolerant parsing
+    # Try CSV first: sniff the encoding once, then parse with the fast C
+    # engine when the header looks comma-separated
     if csv_path.exists():
-        trials = [
-            dict(encoding="utf-8-sig", sep=None, engine="python"),
-            dict(encoding="utf-8", sep=None, engine="python"),
-            dict(encoding="latin1", sep=None, engine="python"),
-        ]
-        for t in trials:
+        enc = _sniff_encoding(csv_path)
+        try:
+            with open(csv_path, encoding=enc, errors="replace") as f:
+                first_line = f.readline()
+        except OSError:
+            first_line = ""
+        if first_line.count(",") >= max(first_line.count(c) for c in ";\t|"):
             try:
-                df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", **t)
-                break
+                df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", usecols=_keep_col,
+                                 encoding=enc, engine="c")
             except Exception as e:
-                errors.append(f"CSV read failed ({t}): {type(e).__name__}: {e}")
+                errors.append(f"CSV read failed (engine='c', encoding={enc!r}): {type(e).__name__}: {e}")
+        if df is None:
+            # Unusual delimiter or a parse the C engine rejected — let the
+            # python engine sniff the separator with the detected encoding
+            for t in (dict(encoding=enc, sep=None, engine="python"),
+                      dict(encoding="latin1", sep=None, engine="python")):
+                try:
+                    df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", usecols=_keep_col, **t)
+                    break
+                except Exception as e:
+                    errors.append(f"CSV read failed ({t}): {type(e).__name__}: {e}")
 
     # Fallback: Excel
     if df is None and xlsx_path.exists():
         try:
-            df = pd.read_excel(xlsx_path, dtype=str)  # requires openpyxl (already in your requirements.txt)
+            df = pd.read_excel(xlsx_path, dtype=str, usecols=_keep_col)  # requires openpyxl (already in your requirements.txt)
         except Exception as e:
             errors.append(f"Excel read failed: {type(e).__name__}: {e}")
 
@@ -61,8 +104,7 @@ def load_questions(base_name: str = "questions"):
     df.columns = [norm(c) for c in df.columns]
 
     # Ensure required columns exist
-    required = ["No", "Question", "A", "B", "C", "D", "Correct"]
-    for col in required:
+    for col in REQUIRED:
         if col not in df.columns:
             df[col] = ""
 
@@ -74,12 +116,14 @@ def load_questions(base_name: str = "questions"):
     df = df[df["Question"] != ""].copy()
 
     # Coerce Correct to A/B/C/D (or blank)
-    df["Correct"] = df["Correct"].str.upper().where(df["Correct"].str.upper().isin(list("ABCD")), "")
+    u = df["Correct"].str.upper()  # upper-case once, not per comparison pass
+    df["Correct"] = u.where(u.isin(list("ABCD")), "")
 
-    # Reorder columns
-    extras = [c for c in df.columns if c not in required]
-    df = df[required + extras].reset_index(drop=True)
+    # Only required columns survive the usecols filter; fix their order
+    df = df[REQUIRED].reset_index(drop=True)
 
+    # Immutable row cache: tuple indexing is ~ns, df.iloc builds a Series
+    df.attrs["rows_tup"] = tuple(df.itertuples(index=False, name=None))
     return df
 
 QUESTIONS_BASENAME = "questions"  # will try questions.csv then questions.xlsx
@@ -99,16 +143,20 @@ def init_quiz(mode: str, num_questions: int, shuffle: bool):
     total = len(df)
     num_questions = max(1, min(int(num_questions), total))
 
-    q_indices = list(range(total))
+    # Sample question ids in C instead of shuffling a size-total Python list
+    rng = np.random.default_rng()
     if shuffle:
-        random.seed()  # new shuffle on each start
-        random.shuffle(q_indices)
-    q_indices = q_indices[:num_questions]
+        q_indices = rng.choice(total, size=num_questions, replace=False)
+    else:
+        q_indices = np.arange(num_questions)
 
     st.session_state.q_indices = q_indices
     st.session_state.idx = 0
     st.session_state.answers = {}       # {global_idx: "A"/"B"/"C"/"D"}
-    st.session_state.correct_map = {i: (df.iloc[i]["Correct"] or "").strip().upper() for i in q_indices}
+    # One column slice instead of a df.iloc row lookup per question
+    # (Correct is already uppercased and validated at load)
+    correct_vals = df["Correct"].to_numpy()
+    st.session_state.correct_map = {i: correct_vals[i] for i in q_indices}
     st.session_state.score = 0
     st.session_state.finished = False
     st.session_state.mode = mode
@@ -130,16 +178,20 @@ def go_next():
     st.rerun()
 
 def go_prev():
-    st.session_state.idx = max(0, st.session_state.idx - 1)
-    st.rerun()
+    new_idx = max(0, st.session_state.idx - 1)
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
 def jump_to(local_idx: int):
-    st.session_state.idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
-    st.rerun()
+    new_idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
 def render_options(row):
-    opts = [("A", row["A"]), ("B", row["B"]), ("C", row["C"]), ("D", row["D"])]
-    opts = [(k, v) for k, v in opts if str(v).strip() != ""]
+    # row is a rows_tup entry: (No, Question, A, B, C, D, Correct)
+    opts = [(k, v) for k, v in zip("ABCD", row[2:6]) if str(v).strip() != ""]
     labels = [f"{k}. {v}" for k, v in opts]
     keys = [k for k, _ in opts]
     return keys, labels
@@ -236,8 +288,8 @@ def render_quiz():
         render_question_map()
 
     gid = st.session_state.q_indices[st.session_state.idx]
-    row = df.iloc[gid]
-    st.markdown(f"### {row['Question']}")
+    row = df.attrs["rows_tup"][gid]  # (No, Question, A, B, C, D, Correct)
+    st.markdown(f"### {row[1]}")
 
     keys, labels = render_options(row)
 
@@ -254,7 +306,10 @@ def render_quiz():
     # Answer form
     with st.form(key=f"form_{gid}"):
         prev_choice = st.session_state.answers.get(gid, None)
-        prev_index = keys.index(prev_choice) if prev_choice in keys else None
+        try:  # one scan instead of `in` + .index
+            prev_index = keys.index(prev_choice)
+        except ValueError:
+            prev_index = None
         choice_idx = st.radio("Select your answer:",
                               options=list(range(len(labels))),
                               format_func=lambda i: labels[i],
@@ -304,37 +359,37 @@ def render_quiz():
     if navR.button("Next ▶", use_container_width=True, disabled=disable_next, help=help_txt):
         go_next()
 
+_STATUS_LABELS = np.array(["Correct ✅", "Incorrect ❌", "No key ℹ️", "Unanswered ⚠️"])
+
+def _compute_status(chosen_arr, correct_arr):
+    """Vectorized status codes (indices into _STATUS_LABELS) for the results screen."""
+    has_key = correct_arr != ""
+    match = has_key & (chosen_arr == correct_arr)
+    return np.where(match, 0,
+                    np.where((chosen_arr != "") & has_key, 1,
+                             np.where(~has_key, 2, 3)))
+
 def render_results():
     st.header("📊 Results")
     total = len(st.session_state.q_indices)
 
+    qi = st.session_state.q_indices
+    chosen = np.array([st.session_state.answers.get(g, "") for g in qi], dtype=object)
+    correct = np.array([st.session_state.correct_map.get(g, "") for g in qi], dtype=object)
+    # One status pass feeds both the exam score and the review labels
+    status_codes = _compute_status(chosen, correct)
+
     if st.session_state.mode.startswith("Exam"):
-        score = 0
-        for gid in st.session_state.q_indices:
-            chosen = st.session_state.answers.get(gid, "")
-            correct = st.session_state.correct_map.get(gid, "").upper()
-            if correct and chosen == correct:
-                score += 1
-        st.session_state.score = score
+        st.session_state.score = int((status_codes == 0).sum())
 
     st.metric("Score", f"{st.session_state.score} / {total}")
 
-    # Review table
-    rows = []
-    for gid in st.session_state.q_indices:
-        q = df.iloc[gid]
-        chosen = st.session_state.answers.get(gid, "")
-        correct = st.session_state.correct_map.get(gid, "").upper()
-        status = ("Correct ✅" if correct and chosen == correct else
-                  ("Incorrect ❌" if chosen and correct else
-                   ("No key ℹ️" if not correct else "Unanswered ⚠️")))
-        rows.append({
-            "No": q["No"],
-            "Question": q["Question"],
-            "A": q["A"], "B": q["B"], "C": q["C"], "D": q["D"],
-            "Chosen": chosen, "Correct": correct, "Status": status
-        })
-    review_df = pd.DataFrame(rows)
+    # Review table — one vectorized slice instead of a per-row Python loop
+    review_df = df.iloc[qi][["No", "Question", "A", "B", "C", "D"]].reset_index(drop=True)
+    review_df.attrs = {}  # drop render caches inherited from df; they don't serialize to the frontend
+    review_df["Chosen"] = chosen
+    review_df["Correct"] = correct
+    review_df["Status"] = _STATUS_LABELS[status_codes]
     st.dataframe(review_df, use_container_width=True)
     st.download_button("⬇️ Download review (CSV)",
                        data=review_df.to_csv(index=False).encode("utf-8-sig"),
@@ -1,22 +1,37 @@
 
+import csv
 import os
-import random
+import re
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import streamlit as st
 
 st.set_page_config(page_title="MCQ Quiz", layout="wide")
 
+REQUIRED = ["No", "Question", "A", "B", "C", "D", "Correct"]
+_REQUIRED_SET = frozenset(REQUIRED)
+
+def _keep_col(name) -> bool:
+    """usecols filter: skip columns the app never reads at the parser level."""
+    return str(name).replace("\ufeff", "").strip() in _REQUIRED_SET
+
+# Compiled once; .map() below calls the bound sub directly per element
+_WS_SUB = re.compile(r"\s+").sub
+
 # ==================================
 # Data Loading (robust & friendly)
 # ==================================
-@st.cache_data
+@st.cache_resource
 def load_questions(base_name: str = "questions"):
     """
     Load a question bank from CSV (preferred) or XLSX (fallback).
     Required columns: No, Question, A, B, C, D, Correct
-    Returns a cleaned DataFrame.
+    Returns a cleaned DataFrame. Cached as a shared resource (no pickle
+    copy per rerun) — callers must treat the returned df as read-only.
     """
     p = Path(base_name)
     csv_path = p.with_suffix(".csv")
@@ -25,8 +40,35 @@ def load_questions(base_name: str = "questions"):
     df = None
     errors = []
 
-    # Try CSV first with tolerant parsing
+    # Try CSV first: PyArrow's multi-threaded reader tokenizes in parallel and
+    # keeps strings Arrow-backed. Anything it can't handle (e.g. latin1 files)
+    # falls through to the tolerant pandas trials below.
     if csv_path.exists():
+        try:
+            with open(csv_path, "rb") as f:
+                header = f.readline().decode("utf-8-sig")
+            sep = max(",;\t|", key=header.count)
+            names = next(csv.reader([header], delimiter=sep))
+            keep = [n for n in names if _keep_col(n)]
+            if not keep:
+                # pyarrow treats an empty include_columns as "include all",
+                # so an unrecognized header must bail to the pandas trials
+                raise ValueError(f"no required columns in header: {names!r}")
+            tbl = pacsv.read_csv(
+                csv_path,
+                read_options=pacsv.ReadOptions(column_names=names, skip_rows=1),
+                parse_options=pacsv.ParseOptions(delimiter=sep,
+                                                 invalid_row_handler=lambda _row: "skip"),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={n: pa.string() for n in names},
+                    include_columns=keep,
+                ),
+            )
+            df = tbl.to_pandas(types_mapper=pd.ArrowDtype)
+        except Exception as e:
+            errors.append(f"PyArrow CSV read failed: {type(e).__name__}: {e}")
+
+    if df is None and csv_path.exists():
         trials = [
             dict(encoding="utf-8-sig", sep=None, engine="python"),
             dict(encoding="utf-8", sep=None, engine="python"),
@@ -34,7 +76,7 @@ def load_questions(base_name: str = "questions"):
         ]
         for t in trials:
             try:
-                df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", **t)
+                df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", usecols=_keep_col, **t)
                 break
             except Exception as e:
                 errors.append(f"CSV read failed ({t}): {type(e).__name__}: {e}")
@@ -42,7 +84,7 @@ def load_questions(base_name: str = "questions"):
     # Fallback: Excel
     if df is None and xlsx_path.exists():
         try:
-            df = pd.read_excel(xlsx_path, dtype=str)  # requires openpyxl (already in your requirements.txt)
+            df = pd.read_excel(xlsx_path, dtype=str, usecols=_keep_col)  # requires openpyxl (already in your requirements.txt)
         except Exception as e:
             errors.append(f"Excel read failed: {type(e).__name__}: {e}")
 
@@ -57,40 +99,52 @@ def load_questions(base_name: str = "questions"):
 
     # Normalize headers
     def norm(s):
-        return str(s).replace("\\ufeff", "").strip()
+        return str(s).replace("\ufeff", "").strip()
     df.columns = [norm(c) for c in df.columns]
 
     # Ensure required columns exist
-    required = ["No", "Question", "A", "B", "C", "D", "Correct"]
-    for col in required:
+    for col in REQUIRED:
         if col not in df.columns:
             df[col] = ""
 
-    # Clean values
+    # Clean values — one pass per string: the precompiled \s+ collapse is
+    # fused with the strip instead of two .str passes (and two regex compiles)
     for col in df.columns:
-        df[col] = df[col].astype(str).str.replace(r"\\s+", " ", regex=True).str.strip()
+        df[col] = df[col].astype(str).map(lambda x, _sub=_WS_SUB: _sub(" ", x).strip())
 
     # Drop rows with no question
     df = df[df["Question"] != ""].copy()
 
     # Coerce Correct to A/B/C/D (or blank)
-    df["Correct"] = df["Correct"].str.upper().where(df["Correct"].str.upper().isin(list("ABCD")), "")
+    u = df["Correct"].str.upper()  # upper-case once, not per comparison pass
+    df["Correct"] = u.where(u.isin(list("ABCD")), "")
 
-    # Reorder columns
-    extras = [c for c in df.columns if c not in required]
-    df = df[required + extras].reset_index(drop=True)
+    # Only required columns survive the usecols filter; fix their order
+    df = df[REQUIRED].reset_index(drop=True)
+
+    # Per-row caches so session setup doesn't go through the pandas row indexer
+    df.attrs["letters_per_row"] = [
+        tuple(L for L, v in zip("ABCD", vals) if v)
+        for vals in zip(df["A"], df["B"], df["C"], df["D"])
+    ]
+    # Column arrays for O(1) cell access on the render hot path (no Series per lookup)
+    df.attrs["cols"] = {c: df[c].to_numpy() for c in REQUIRED}
+    df.attrs["correct_arr"] = df.attrs["cols"]["Correct"]
 
     return df
 
 QUESTIONS_BASENAME = "questions"  # will try questions.csv then questions.xlsx
 df = load_questions(QUESTIONS_BASENAME)
 
-# Optional debug (helps diagnose CSV issues on cloud)
-with st.sidebar.expander("🧰 Data debug"):
-    st.write("CWD:", os.getcwd())
-    st.write("Files here:", os.listdir("."))
-    st.write("Data shape:", df.shape)
-    st.write(df.head(3))
+# Optional debug (helps diagnose CSV issues on cloud). Behind a checkbox:
+# expander bodies execute on every rerun even when collapsed, so the listdir
+# and the df.head() Arrow serialization were pure overhead during a quiz.
+if st.sidebar.checkbox("Show data debug", value=False):
+    with st.sidebar.expander("🧰 Data debug", expanded=True):
+        st.write("CWD:", os.getcwd())
+        st.write("Files here:", os.listdir("."))
+        st.write("Data shape:", df.shape)
+        st.write(df.head(3))
 
 # ==================================
 # Helpers & Session
@@ -99,33 +153,42 @@ def init_quiz(mode: str, num_questions: int, shuffle_questions: bool, shuffle_op
     total = len(df)
     num_questions = max(1, min(int(num_questions), total))
 
-    q_indices = list(range(total))
+    # Local generator: no global random-state reseed per run, and the
+    # permutation happens in C instead of Python-level list swaps
+    rng = np.random.default_rng()
     if shuffle_questions:
-        random.seed()  # new shuffle on each start
-        random.shuffle(q_indices)
-    q_indices = q_indices[:num_questions]
+        q_indices = rng.permutation(total)[:num_questions]
+    else:
+        q_indices = np.arange(num_questions)
 
     # Build per-question option order (A-D minus empties), optionally shuffled
-    opt_order = {}
+    letters_per_row = df.attrs["letters_per_row"]
+    opt_order = []
     for gid in q_indices:
-        letters = [L for L in ["A","B","C","D"] if str(df.iloc[gid][L]).strip() != ""]
-        order = letters[:]
+        order = list(letters_per_row[gid])
         if shuffle_options and len(order) > 1:
-            random.shuffle(order)
-        opt_order[gid] = order
+            order = list(rng.permutation(order))
+        opt_order.append(order)
+
+    n = len(q_indices)
+    correct_arr = df.attrs["correct_arr"]
 
     st.session_state.q_indices = q_indices
     st.session_state.idx = 0
-    st.session_state.answers = {}       # {global_idx: "A"/"B"/"C"/"D"} (original letters)
-    st.session_state.correct_map = {i: (df.iloc[i]["Correct"] or "").strip().upper() for i in q_indices}
+    # Session answer/flag state as flat arrays keyed by local position —
+    # unhashed O(1) lookups and ~1 byte per question instead of dict/set entries
+    st.session_state.answers = np.full(n, "", dtype="U1")    # chosen original letter, "" = unanswered
+    st.session_state.correct_arr = np.array([correct_arr[g] for g in q_indices], dtype="U1")
+    st.session_state.submitted = np.zeros(n, np.bool_)       # Practice: checked
+    st.session_state.scored = np.zeros(n, np.bool_)          # Practice: already counted in score
+    st.session_state.flags = np.zeros(n, np.bool_)           # flagged questions
     st.session_state.score = 0
     st.session_state.finished = False
+    st.session_state._exam_scored = False
+    st.session_state._status_dirty = True
     st.session_state.mode = mode
     st.session_state.screen = "quiz"
-    st.session_state.submitted = {}     # {global_idx: True} after "Check Answer" (Practice)
-    st.session_state.scored = set()     # which questions already incremented score (Practice)
-    st.session_state.flags = set()      # flagged global indices
-    st.session_state.opt_order = opt_order
+    st.session_state.opt_order = opt_order                   # option order per local position
     st.session_state.shuffle_options = shuffle_options
 
 def go_home():
@@ -141,30 +204,33 @@ def go_next():
     st.rerun()
 
 def go_prev():
-    st.session_state.idx = max(0, st.session_state.idx - 1)
-    st.rerun()
+    new_idx = max(0, st.session_state.idx - 1)
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
 def jump_to(local_idx: int):
-    st.session_state.idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
-    st.rerun()
+    new_idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
-def render_options(gid, row):
+def render_options(local_idx, gid):
     # Use the stored order for this question so it's consistent when revisiting
-    order = st.session_state.opt_order.get(gid, [L for L in ["A","B","C","D"] if str(row[L]).strip() != ""])
-    labels = [f"{L}. {row[L]}" for L in order]
+    cols = df.attrs["cols"]
+    order = st.session_state.opt_order[local_idx]
+    labels = [f"{L}. {cols[L][gid]}" for L in order]
     return order, labels  # 'order' acts as the keys
 
 def status_for(local_idx: int):
     """Return (symbol, help_text) for the session question at position local_idx."""
-    gid = st.session_state.q_indices[local_idx]
-    flagged = gid in st.session_state.flags
-    answered = gid in st.session_state.answers
+    flagged = bool(st.session_state.flags[local_idx])
+    chosen = st.session_state.answers[local_idx]
+    answered = chosen != ""
 
     if st.session_state.mode.startswith("Practice"):
-        submitted = st.session_state.submitted.get(gid, False)
-        if submitted:
-            chosen = st.session_state.answers.get(gid, "")
-            correct = st.session_state.correct_map.get(gid, "")
+        if st.session_state.submitted[local_idx]:
+            correct = st.session_state.correct_arr[local_idx]
             if correct and chosen == correct:
                 sym = "✅"  # correct (checked)
                 hint = "Answered & correct"
@@ -218,18 +284,33 @@ def render_question_map():
     st.markdown("##### Question Map")
     st.caption("Legend: ⚑ flagged • ✅ correct (practice) • ❌ incorrect (practice) • • answered • ◻️ not answered")
     n = len(st.session_state.q_indices)
-    COLS = 12
-    rows = (n + COLS - 1) // COLS
-    for r in range(rows):
-        cols = st.columns(COLS)
-        for c in range(COLS):
-            i = r * COLS + c
-            if i >= n:
-                continue
-            sym, hint = status_for(i)
-            label = f"{i+1}\n{sym}"
-            if cols[c].button(label, key=f"jump_{i}", help=hint):
-                jump_to(i)
+    # Statuses only change on answer/check/flag, so rebuild the cache just then
+    if st.session_state.get("_status_dirty", True):
+        st.session_state._status_cache = [status_for(i) for i in range(n)]
+        st.session_state._status_dirty = False
+    cache = st.session_state._status_cache
+
+    # One markdown grid instead of N st.button widgets — Streamlit's state
+    # diffing scales with widget count, which dominated large sessions.
+    # (?jump= anchor links would reload the page and drop the session, so
+    # navigation goes through the single jump control below.)
+    cells = "".join(
+        f'<span class="qmap-cell" title="{hint}">{i + 1}<br>{sym}</span>'
+        for i, (sym, hint) in enumerate(cache)
+    )
+    st.markdown(
+        '<style>.qmap{display:grid;grid-template-columns:repeat(12,1fr);gap:4px}'
+        '.qmap-cell{border:1px solid #ddd;border-radius:4px;padding:2px;'
+        'text-align:center;font-size:0.8em}</style>'
+        f'<div class="qmap">{cells}</div>',
+        unsafe_allow_html=True,
+    )
+
+    jump_col, go_col = st.columns([3, 1])
+    target = jump_col.number_input("Jump to question", min_value=1, max_value=n,
+                                   value=st.session_state.idx + 1, step=1)
+    if go_col.button("Go", key="jump_go", use_container_width=True):
+        jump_to(int(target) - 1)
 
 def render_quiz():
     current = st.session_state.idx + 1
@@ -246,30 +327,38 @@ def render_quiz():
     with st.expander("📌 Navigate by question number", expanded=False):
         render_question_map()
 
-    gid = st.session_state.q_indices[st.session_state.idx]
-    row = df.iloc[gid]
-    st.markdown(f"### {row['Question']}")
+    i = st.session_state.idx
+    gid = st.session_state.q_indices[i]
+    cols = df.attrs["cols"]
+    st.markdown(f"### {cols['Question'][gid]}")
 
-    order, labels = render_options(gid, row)
+    order, labels = render_options(i, gid)
 
-    # Flag/Unflag
-    flag_col, _ = st.columns([1, 3])
-    flagged = gid in st.session_state.flags
-    if flag_col.button("Unflag ⚑" if flagged else "Flag ⚑", key=f"flag_{gid}"):
-        if flagged:
-            st.session_state.flags.discard(gid)
-        else:
-            st.session_state.flags.add(gid)
-        st.rerun()
+    # Flag/Unflag — stable key + on_click so the widget node survives Next/Previous
+    def _toggle_flag(local_i=i):
+        st.session_state.flags[local_i] = not st.session_state.flags[local_i]
+        st.session_state._status_dirty = True
 
-    # Answer form
-    with st.form(key=f"form_{gid}"):
-        prev_choice = st.session_state.answers.get(gid, None)
-        prev_index = order.index(prev_choice) if prev_choice in order else None
+    flag_col, _ = st.columns([1, 3])
+    flagged = bool(st.session_state.flags[i])
+    flag_col.button("Unflag ⚑" if flagged else "Flag ⚑", key="flag_btn", on_click=_toggle_flag)
+
+    # Answer form — stable keys: per-gid keys made Streamlit discard and
+    # rebuild the widget tree on every question change. Seed the radio only
+    # when the displayed question changes — an unconditional write here
+    # clobbers the value the form just committed on the submit rerun.
+    if st.session_state.get("_radio_gid") != gid:
+        prev_choice = st.session_state.answers[i] or None
+        try:  # one scan instead of `in` + .index
+            st.session_state["answer_radio"] = order.index(prev_choice)
+        except ValueError:
+            st.session_state["answer_radio"] = None
+        st.session_state["_radio_gid"] = gid
+    with st.form(key="answer_form"):
         choice_idx = st.radio("Select your answer:",
                               options=list(range(len(labels))),
                               format_func=lambda i: labels[i],
-                              index=prev_index)
+                              key="answer_radio")
 
         submit_label = "Check Answer ✅" if st.session_state.mode.startswith("Practice") else "Save Answer 💾"
         submitted = st.form_submit_button(submit_label, use_container_width=True)
@@ -280,16 +369,17 @@ def render_quiz():
             st.stop()
 
         chosen_letter = order[choice_idx]  # Map back to original letter A/B/C/D
-        st.session_state.answers[gid] = chosen_letter
+        st.session_state.answers[i] = chosen_letter
+        st.session_state._status_dirty = True
 
         if st.session_state.mode.startswith("Practice"):
-            st.session_state.submitted[gid] = True
-            correct_letter = st.session_state.correct_map.get(gid, "")
+            st.session_state.submitted[i] = True
+            correct_letter = st.session_state.correct_arr[i]
             if correct_letter and chosen_letter == correct_letter:
                 st.success(f"✅ Hebat Sayang! Kamu pinter banget, jawaban kamu benar ({chosen_letter})")
-                if gid not in st.session_state.scored:
+                if not st.session_state.scored[i]:
                     st.session_state.score += 1
-                    st.session_state.scored.add(gid)
+                    st.session_state.scored[i] = True
             else:
                 if correct_letter in {"A", "B", "C", "D"}:
                     st.error(f"❌ Gapapa Sayang! Ayo coba lagi, jawaban yang benar {correct_letter}")
@@ -305,7 +395,7 @@ def render_quiz():
         go_prev()
 
     if st.session_state.mode.startswith("Practice"):
-        checked = st.session_state.submitted.get(gid, False)
+        checked = bool(st.session_state.submitted[i])
         disable_next = not checked
         help_txt = None if checked else "Check answer first to proceed."
     else:
@@ -315,52 +405,60 @@ def render_quiz():
     if navR.button("Next ▶", use_container_width=True, disabled=disable_next, help=help_txt):
         go_next()
 
+@st.cache_data(show_spinner=False)
+def _review_csv_bytes(cache_key, _review_df):
+    """CSV-encode the review table once per answer set.
+
+    The rendered bytes are keyed on (question ids, chosen answers); reruns of
+    the results screen reuse them instead of re-encoding for a button that is
+    rarely clicked. _review_df is excluded from hashing (leading underscore).
+    """
+    return _review_df.to_csv(index=False).encode("utf-8-sig")
+
 def render_results():
     st.header("📊 Results")
-    total = len(st.session_state.q_indices)
+    q_indices = st.session_state.q_indices
+    total = len(q_indices)
 
-    if st.session_state.mode.startswith("Exam"):
-        score = 0
-        for gid in st.session_state.q_indices:
-            chosen = st.session_state.answers.get(gid, "")
-            correct = st.session_state.correct_map.get(gid, "").upper()
-            if correct and chosen == correct:
-                score += 1
-        st.session_state.score = score
+    chosen = st.session_state.answers
+    correct = st.session_state.correct_arr
+    has_key = correct != ""
+
+    if st.session_state.mode.startswith("Exam") and not st.session_state.get("_exam_scored"):
+        # One vectorized compare; reruns of the results screen reuse the stored score
+        st.session_state.score = int((has_key & (chosen == correct)).sum())
+        st.session_state._exam_scored = True
 
     st.metric("Score", f"{st.session_state.score} / {total}")
 
-    # Review table
-    rows = []
-    for gid in st.session_state.q_indices:
-        q = df.iloc[gid]
-        chosen = st.session_state.answers.get(gid, "")
-        correct = st.session_state.correct_map.get(gid, "").upper()
-        status = ("Correct ✅" if correct and chosen == correct else
-                  ("Incorrect ❌" if chosen and correct else
-                   ("No key ℹ️" if not correct else "Unanswered ⚠️")))
-        rows.append({
-            "No": q["No"],
-            "Question": q["Question"],
-            "A": q["A"], "B": q["B"], "C": q["C"], "D": q["D"],
-            "Chosen": chosen, "Correct": correct, "Status": status
-        })
-    review_df = pd.DataFrame(rows)
+    # Review table — one vectorized slice instead of a per-row Python loop
+    review_df = df.iloc[q_indices][["No", "Question", "A", "B", "C", "D"]].reset_index(drop=True)
+    review_df.attrs = {}  # drop render caches inherited from df; they don't serialize to the frontend
+    review_df["Chosen"] = chosen
+    review_df["Correct"] = correct
+    review_df["Status"] = np.where(
+        has_key & (chosen == correct), "Correct ✅",
+        np.where((chosen != "") & has_key, "Incorrect ❌",
+                 np.where(~has_key, "No key ℹ️", "Unanswered ⚠️")))
     st.dataframe(review_df, use_container_width=True)
     st.download_button("⬇️ Download review (CSV)",
-                       data=review_df.to_csv(index=False).encode("utf-8-sig"),
+                       data=_review_csv_bytes((tuple(q_indices), tuple(chosen)), review_df),
                        file_name="quiz_review.csv", mime="text/csv")
 
     colA, colB = st.columns([1, 1])
     if colA.button("🏠 Home"):
         go_home()
     if colB.button("🔁 Restart same settings"):
+        n = len(st.session_state.q_indices)
         st.session_state.idx = 0
-        st.session_state.answers = {}
+        st.session_state.answers = np.full(n, "", dtype="U1")
         st.session_state.score = 0
         st.session_state.finished = False
-        st.session_state.submitted = {}
-        st.session_state.scored = set()
+        st.session_state.submitted = np.zeros(n, np.bool_)
+        st.session_state.scored = np.zeros(n, np.bool_)
+        st.session_state._exam_scored = False
+        st.session_state._status_dirty = True
+        st.session_state.pop("_radio_gid", None)  # reseed the radio on re-entry
         st.session_state.screen = "quiz"
         st.rerun()
 
@@ -1,64 +1,164 @@
 
-import os
-import random
+import csv
 import hashlib
+import mmap
+import os
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
 st.set_page_config(page_title="MCQ Quiz", layout="wide")
 
+REQUIRED = ["No", "Question", "A", "B", "C", "D", "Correct"]
+_REQUIRED_SET = frozenset(REQUIRED)
+
+def _keep_col(name) -> bool:
+    """usecols filter: skip columns the app never reads at the parser level."""
+    return str(name).replace("\ufeff", "").strip() in _REQUIRED_SET
+
 # ==================================
 # Helpers
 # ==================================
-def file_signature(base_name="questions"):
-    """MD5 hash of local questions file to bust cache when it changes."""
+try:
+    import xxhash  # optional: multi-GB/s xxHash3 when installed
+except ImportError:
+    xxhash = None
+
+@st.cache_data(show_spinner=False)
+def _content_hash(path: str, mtime_ns: int, size: int) -> str:
+    """Hash the file contents, memoized per (path, mtime, size).
+
+    The stat fields key the cache, which lives in cache_data rather than
+    lru_cache because Streamlit rebuilds the module (and any lru_cache on
+    it) every rerun; only an actual change triggers a re-hash. The file is
+    mmapped so the hash streams straight off the OS page cache instead of
+    first copying the whole file into a bytes object.
+    """
+    h = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    if size:  # mmap rejects empty files
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h.update(mm)
+    return h.hexdigest()
+
+def file_signature(base_name="questions", content_hash=False):
+    """Cheap signature of the local questions file to bust cache when it changes.
+
+    Name + mtime + size from one stat() call — no need to read and hash the
+    whole file on every rerun just to key the cache. Pass content_hash=True
+    on filesystems with unreliable mtimes (some network mounts); the hash is
+    memoized on the same stat fields, so it still costs one stat per rerun.
+    """
     p = Path(base_name)
     candidate = p.with_suffix(".csv") if p.with_suffix(".csv").exists() else p.with_suffix(".xlsx")
     if not candidate.exists():
         return "nofile"
-    return hashlib.md5(candidate.read_bytes()).hexdigest()
+    s = candidate.stat()
+    if content_hash:
+        return _content_hash(str(candidate), s.st_mtime_ns, s.st_size)
+    return f"{candidate.name}:{s.st_mtime_ns}:{s.st_size}"
+
+def _sniff_dialect(csv_path: Path):
+    """Detect (sep, encoding) from the first 8 KB so the fast C engine can parse."""
+    with open(csv_path, "rb") as f:
+        head = f.read(8192)
+    sample = None
+    for enc in ("utf-8-sig", "utf-8"):
+        try:
+            sample = head.decode(enc)
+        except UnicodeDecodeError:
+            try:  # a multi-byte char may sit on the 8 KB boundary
+                sample = head[:head.rfind(b"\n")].decode(enc)
+            except (UnicodeDecodeError, ValueError):
+                continue
+        break
+    if sample is None:
+        enc = "latin1"
+        sample = head.decode(enc)
+    try:
+        sep = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        sep = ","
+    return sep, enc
+
+_CACHE_DIR = Path(".cache")
+
+def _gc_parquet_cache(keep: int = 3):
+    """Drop all but the newest few normalized sidecars so they don't pile up."""
+    try:
+        snaps = sorted(_CACHE_DIR.glob("*.parquet"),
+                       key=lambda q: q.stat().st_mtime_ns, reverse=True)
+        for stale in snaps[keep:]:
+            stale.unlink(missing_ok=True)
+    except OSError:
+        pass
 
 # ==================================
 # Data Loading (remote + local fallback)
 # ==================================
-@st.cache_data(ttl=60)
+@st.cache_resource(ttl=60)
 def load_questions_remote(url: str):
-    """Load from a published Google Sheets CSV URL. Auto-refresh every 60s."""
-    df = pd.read_csv(url, dtype=str).fillna("")
-    df = normalize_and_validate(df)
-    return df
+    """Load from a published Google Sheets CSV URL. Auto-refresh every 60s.
 
-@st.cache_data
+    Cached as a shared resource (no pickle copy per rerun) — treat the
+    returned df as read-only.
+    """
+    df = pd.read_csv(url, dtype=str, usecols=_keep_col).fillna("")
+    return _attach_row_caches(normalize_and_validate(df))
+
+@st.cache_resource
 def load_questions_local(base_name: str = "questions", sig: str = ""):
     """
     Load from CSV (preferred) or XLSX (fallback) in repo root.
     'sig' is a cache-buster derived from file_signature().
+    Cached as a shared resource (no pickle copy per rerun) — treat the
+    returned df as read-only.
     """
     p = Path(base_name)
     csv_path = p.with_suffix(".csv")
     xlsx_path = p.with_suffix(".xlsx")
+    parquet_path = _CACHE_DIR / f"{sig.replace(':', '-')}.parquet" if sig and sig != "nofile" else None
+
+    # Normalized Parquet sidecar keyed by the file signature: columnar load on
+    # cold start is far cheaper than re-parsing CSV/XLSX and re-running the
+    # normalize pipeline, and a changed source simply keys a new file.
+    if parquet_path is not None and parquet_path.exists():
+        try:
+            return _attach_row_caches(pd.read_parquet(parquet_path))
+        except Exception:
+            pass  # corrupt sidecar — fall through to the full parse
 
     df = None
     errors = []
 
     if csv_path.exists():
-        trials = [
-            dict(encoding="utf-8-sig", sep=None, engine="python"),
-            dict(encoding="utf-8", sep=None, engine="python"),
-            dict(encoding="latin1", sep=None, engine="python"),
-        ]
-        for t in trials:
-            try:
-                df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", **t)
-                break
-            except Exception as e:
-                errors.append(f"CSV read failed ({t}): {type(e).__name__}: {e}")
+        # Sniff the dialect once from the file head, then parse with the C
+        # engine — 5-10x faster than sep=None + engine="python" every load.
+        sep, enc = _sniff_dialect(csv_path)
+        try:
+            df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip",
+                             usecols=_keep_col, sep=sep, encoding=enc, engine="c")
+        except Exception as e:
+            errors.append(f"CSV read failed (engine='c', sep={sep!r}, encoding={enc!r}): "
+                          f"{type(e).__name__}: {e}")
+        if df is None:
+            # Fallback: the old tolerant python-engine trials
+            trials = [
+                dict(encoding="utf-8-sig", sep=None, engine="python"),
+                dict(encoding="utf-8", sep=None, engine="python"),
+                dict(encoding="latin1", sep=None, engine="python"),
+            ]
+            for t in trials:
+                try:
+                    df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", usecols=_keep_col, **t)
+                    break
+                except Exception as e:
+                    errors.append(f"CSV read failed ({t}): {type(e).__name__}: {e}")
 
     if df is None and xlsx_path.exists():
         try:
-            df = pd.read_excel(xlsx_path, dtype=str)  # requires openpyxl if you use XLSX
+            df = pd.read_excel(xlsx_path, dtype=str, usecols=_keep_col)  # requires openpyxl if you use XLSX
         except Exception as e:
             errors.append(f"Excel read failed: {type(e).__name__}: {e}")
 
@@ -71,26 +171,48 @@ def load_questions_local(base_name: str = "questions", sig: str = ""):
         st.stop()
 
     df = normalize_and_validate(df)
-    return df
+    if parquet_path is not None:
+        try:
+            _CACHE_DIR.mkdir(exist_ok=True)
+            df.to_parquet(parquet_path, compression="zstd")
+            _gc_parquet_cache()
+        except Exception:
+            pass  # sidecar is best-effort; never fail the load over it
+    return _attach_row_caches(df)
 
 def normalize_and_validate(df: pd.DataFrame) -> pd.DataFrame:
     """Normalize headers/values and ensure required columns exist."""
-    def norm(s): return str(s).replace("\ufeff", "").strip()
-    df.columns = [norm(c) for c in df.columns]
-    required = ["No", "Question", "A", "B", "C", "D", "Correct"]
-    for col in required:
+    df.columns = df.columns.astype(str).str.replace("\ufeff", "", regex=False).str.strip()
+    for col in REQUIRED:
         if col not in df.columns:
             df[col] = ""
-    # Clean values
+    # Clean values \u2014 Arrow-backed strings run .str ops in C instead of per-cell Python
+    df = df.astype("string[pyarrow]").fillna("")
     for col in df.columns:
-        df[col] = df[col].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+        df[col] = df[col].str.replace(r"\s+", " ", regex=True).str.strip()
     # Drop blank questions
     df = df[df["Question"] != ""].copy()
     # Coerce Correct
-    df["Correct"] = df["Correct"].str.upper().where(df["Correct"].str.upper().isin(list("ABCD")), "")
-    # Reorder
-    extras = [c for c in df.columns if c not in required]
-    return df[required + extras].reset_index(drop=True)
+    u = df["Correct"].str.upper()  # upper-case once, not per comparison pass
+    df["Correct"] = u.where(u.isin(list("ABCD")), "")
+    # Only required columns survive the usecols filter; fix their order
+    return df[REQUIRED].reset_index(drop=True)
+
+def _attach_row_caches(df: pd.DataFrame) -> pd.DataFrame:
+    """Attach the df.attrs caches the session/render paths index into.
+
+    Kept separate from normalize_and_validate: the ndarray caches don't
+    survive Parquet round-trips, so the sidecar stores the plain frame.
+    """
+    # Per-row caches so session setup doesn't go through the pandas row indexer
+    df.attrs["letters_per_row"] = [
+        tuple(L for L, v in zip("ABCD", vals) if v)
+        for vals in zip(df["A"], df["B"], df["C"], df["D"])
+    ]
+    # Column arrays for O(1) cell access on the render hot path (no Series per lookup)
+    df.attrs["cols"] = {c: df[c].to_numpy() for c in REQUIRED}
+    df.attrs["correct_arr"] = df.attrs["cols"]["Correct"]
+    return df
 
 # Load from remote if configured, else local
 REMOTE_URL = st.secrets.get("QUESTIONS_CSV_URL", "").strip()
@@ -105,17 +227,20 @@ else:
 # ==================================
 # Sidebar: Data debug + manual reload
 # ==================================
-with st.sidebar.expander("🧰 Data debug"):
-    st.caption(f"Source: **{DATA_SOURCE}**")
-    if REMOTE_URL:
-        st.write("URL:", REMOTE_URL)
-    st.write("CWD:", os.getcwd())
-    st.write("Files:", os.listdir("."))
-    st.write("Rows:", len(df))
-    if st.button("🔄 Reload questions (clear cache)"):
-        st.cache_data.clear()
-        st.cache_resource.clear()
-        st.rerun()
+# Behind a checkbox: expander bodies execute on every rerun even when
+# collapsed, so the listdir/stat work was pure overhead during a quiz.
+if st.sidebar.checkbox("Show data debug", value=False):
+    with st.sidebar.expander("🧰 Data debug", expanded=True):
+        st.caption(f"Source: **{DATA_SOURCE}**")
+        if REMOTE_URL:
+            st.write("URL:", REMOTE_URL)
+        st.write("CWD:", os.getcwd())
+        st.write("Files:", os.listdir("."))
+        st.write("Rows:", len(df))
+        if st.button("🔄 Reload questions (clear cache)"):
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            st.rerun()
 
 # ==================================
 # Quiz State & Helpers
@@ -124,27 +249,32 @@ def init_quiz(mode: str, num_questions: int, shuffle_questions: bool, shuffle_op
     total = len(df)
     num_questions = max(1, min(int(num_questions), total))
 
-    q_indices = list(range(total))
+    # Local generator: no global random-state reseed per run, and the
+    # permutation happens in C instead of Python-level list swaps
+    rng = np.random.default_rng()
     if shuffle_questions:
-        random.seed()  # new shuffle per run
-        random.shuffle(q_indices)
-    q_indices = q_indices[:num_questions]
+        q_indices = rng.permutation(total)[:num_questions].tolist()
+    else:
+        q_indices = list(range(num_questions))
 
     # Per-question answer order (A-D minus blanks), optionally shuffled
+    letters_per_row = df.attrs["letters_per_row"]
     opt_order = {}
     for gid in q_indices:
-        letters = [L for L in ["A", "B", "C", "D"] if str(df.iloc[gid][L]).strip() != ""]
-        order = letters[:]
+        order = list(letters_per_row[gid])
         if shuffle_options and len(order) > 1:
-            random.shuffle(order)
+            order = list(rng.permutation(order))
         opt_order[gid] = order
 
     st.session_state.q_indices = q_indices
     st.session_state.idx = 0
     st.session_state.answers = {}       # {global_idx: "A"/"B"/"C"/"D"}
-    st.session_state.correct_map = {i: (df.iloc[i]["Correct"] or "").strip().upper() for i in q_indices}
+    correct_arr = df.attrs["correct_arr"]
+    st.session_state.correct_map = {i: correct_arr[i] for i in q_indices}
     st.session_state.score = 0
     st.session_state.finished = False
+    st.session_state._exam_scored = False
+    st.session_state._status_dirty = True
     st.session_state.mode = mode
     st.session_state.screen = "quiz"
     st.session_state.submitted = {}     # Practice: checked
@@ -165,16 +295,25 @@ def go_next():
     st.rerun()
 
 def go_prev():
-    st.session_state.idx = max(0, st.session_state.idx - 1)
-    st.rerun()
+    new_idx = max(0, st.session_state.idx - 1)
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
 def jump_to(local_idx: int):
-    st.session_state.idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
-    st.rerun()
+    new_idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
-def render_options(gid, row):
-    order = st.session_state.opt_order.get(gid, [L for L in ["A","B","C","D"] if str(row[L]).strip() != ""])
-    labels = [f"{L}. {row[L]}" for L in order]
+def render_options(gid):
+    cols = df.attrs["cols"]
+    # dict.get would build the fallback on every call; only hit the
+    # letters_per_row cache when the session really has no stored order
+    order = st.session_state.opt_order.get(gid)
+    if order is None:
+        order = df.attrs["letters_per_row"][gid]
+    labels = [f"{L}. {cols[L][gid]}" for L in order]
     return order, labels
 
 def status_for(local_idx: int):
@@ -233,18 +372,33 @@ def render_question_map():
     st.markdown("##### Question Map")
     st.caption("Legend: ⚑ flagged • ✅ correct (practice) • ❌ incorrect (practice) • • answered • ◻️ not answered")
     n = len(st.session_state.q_indices)
-    COLS = 12
-    rows = (n + COLS - 1) // COLS
-    for r in range(rows):
-        cols = st.columns(COLS)
-        for c in range(COLS):
-            i = r * COLS + c
-            if i >= n:
-                continue
-            sym, hint = status_for(i)
-            label = f"{i+1}\n{sym}"
-            if cols[c].button(label, key=f"jump_{i}", help=hint):
-                jump_to(i)
+    # Statuses only change on answer/check/flag, so rebuild the cache just then
+    if st.session_state.get("_status_dirty", True):
+        st.session_state._status_cache = [status_for(i) for i in range(n)]
+        st.session_state._status_dirty = False
+    cache = st.session_state._status_cache
+
+    # One markdown grid instead of N st.button widgets — Streamlit's state
+    # diffing scales with widget count, which dominated large sessions.
+    # (?jump= anchor links would reload the page and drop the session, so
+    # navigation goes through the single jump control below.)
+    cells = "".join(
+        f'<span class="qmap-cell" title="{hint}">{i + 1}<br>{sym}</span>'
+        for i, (sym, hint) in enumerate(cache)
+    )
+    st.markdown(
+        '<style>.qmap{display:grid;grid-template-columns:repeat(12,1fr);gap:4px}'
+        '.qmap-cell{border:1px solid #ddd;border-radius:4px;padding:2px;'
+        'text-align:center;font-size:0.8em}</style>'
+        f'<div class="qmap">{cells}</div>',
+        unsafe_allow_html=True,
+    )
+
+    jump_col, go_col = st.columns([3, 1])
+    target = jump_col.number_input("Jump to question", min_value=1, max_value=n,
+                                   value=st.session_state.idx + 1, step=1)
+    if go_col.button("Go", key="jump_go", use_container_width=True):
+        jump_to(int(target) - 1)
 
 def render_quiz():
     current = st.session_state.idx + 1
@@ -262,27 +416,34 @@ def render_quiz():
         render_question_map()
 
     gid = st.session_state.q_indices[st.session_state.idx]
-    row = df.iloc[gid]
-    st.markdown(f"### {row['Question']}")
+    cols = df.attrs["cols"]
+    st.markdown(f"### {cols['Question'][gid]}")
 
-    order, labels = render_options(gid, row)
+    order, labels = render_options(gid)
+
+    # Flag/Unflag — stable key + on_click so the widget node survives Next/Previous
+    def _toggle_flag(g=gid):
+        if g in st.session_state.flags: st.session_state.flags.discard(g)
+        else: st.session_state.flags.add(g)
+        st.session_state._status_dirty = True
 
-    # Flag/Unflag
     flag_col, _ = st.columns([1, 3])
     flagged = gid in st.session_state.flags
-    if flag_col.button("Unflag ⚑" if flagged else "Flag ⚑", key=f"flag_{gid}"):
-        if flagged: st.session_state.flags.discard(gid)
-        else: st.session_state.flags.add(gid)
-        st.rerun()
+    flag_col.button("Unflag ⚑" if flagged else "Flag ⚑", key="flag_btn", on_click=_toggle_flag)
 
-    # Answer form
-    with st.form(key=f"form_{gid}"):
+    # Answer form — stable keys: per-gid keys made Streamlit discard and
+    # rebuild the widget tree on every question change. Seed the radio only
+    # when the displayed question changes — an unconditional write here
+    # clobbers the value the form just committed on the submit rerun.
+    if st.session_state.get("_radio_gid") != gid:
         prev_choice = st.session_state.answers.get(gid, None)
-        prev_index = order.index(prev_choice) if prev_choice in order else None
+        st.session_state["answer_radio"] = order.index(prev_choice) if prev_choice in order else None
+        st.session_state["_radio_gid"] = gid
+    with st.form(key="answer_form"):
         choice_idx = st.radio("Select your answer:",
                               options=list(range(len(labels))),
                               format_func=lambda i: labels[i],
-                              index=prev_index)
+                              key="answer_radio")
 
         submit_label = "Check Answer ✅" if st.session_state.mode.startswith("Practice") else "Save Answer 💾"
         submitted = st.form_submit_button(submit_label, use_container_width=True)
@@ -294,6 +455,7 @@ def render_quiz():
 
         chosen_letter = order[choice_idx]  # map to original A/B/C/D
         st.session_state.answers[gid] = chosen_letter
+        st.session_state._status_dirty = True
 
         if st.session_state.mode.startswith("Practice"):
             st.session_state.submitted[gid] = True
@@ -328,40 +490,44 @@ def render_quiz():
     if navR.button("Next ▶", use_container_width=True, disabled=disable_next, help=help_txt):
         go_next()
 
+@st.cache_data(show_spinner=False)
+def _review_csv_bytes(cache_key, _review_df):
+    """CSV-encode the review table once per answer set.
+
+    The rendered bytes are keyed on (question ids, chosen answers); reruns of
+    the results screen reuse them instead of re-encoding for a button that is
+    rarely clicked. _review_df is excluded from hashing (leading underscore).
+    """
+    return _review_df.to_csv(index=False).encode("utf-8-sig")
+
 def render_results():
     st.header("📊 Results")
-    total = len(st.session_state.q_indices)
+    q_indices = st.session_state.q_indices
+    total = len(q_indices)
 
-    if st.session_state.mode.startswith("Exam"):
-        score = 0
-        for gid in st.session_state.q_indices:
-            chosen = st.session_state.answers.get(gid, "")
-            correct = st.session_state.correct_map.get(gid, "").upper()
-            if correct and chosen == correct:
-                score += 1
-        st.session_state.score = score
+    chosen = np.array([st.session_state.answers.get(g, "") for g in q_indices], dtype=object)
+    correct = np.array([st.session_state.correct_map.get(g, "") for g in q_indices], dtype=object)
+    has_key = correct != ""
+
+    if st.session_state.mode.startswith("Exam") and not st.session_state.get("_exam_scored"):
+        # One vectorized compare; reruns of the results screen reuse the stored score
+        st.session_state.score = int((has_key & (chosen == correct)).sum())
+        st.session_state._exam_scored = True
 
     st.metric("Score", f"{st.session_state.score} / {total}")
 
-    rows = []
-    for gid in st.session_state.q_indices:
-        q = df.iloc[gid]
-        chosen = st.session_state.answers.get(gid, "")
-        correct = st.session_state.correct_map.get(gid, "").upper()
-        status = ("Correct ✅"
-                  if correct and chosen == correct else
-                  ("Incorrect ❌" if chosen and correct else
-                   ("No key ℹ️" if not correct else "Unanswered ⚠️")))
-        rows.append({
-            "No": q["No"],
-            "Question": q["Question"],
-            "A": q["A"], "B": q["B"], "C": q["C"], "D": q["D"],
-            "Chosen": chosen, "Correct": correct, "Status": status
-        })
-    review_df = pd.DataFrame(rows)
+    # Review table — one vectorized slice instead of a per-row Python loop
+    review_df = df.iloc[q_indices][["No", "Question", "A", "B", "C", "D"]].reset_index(drop=True)
+    review_df.attrs = {}  # drop render caches inherited from df; they don't serialize to the frontend
+    review_df["Chosen"] = chosen
+    review_df["Correct"] = correct
+    review_df["Status"] = np.where(
+        has_key & (chosen == correct), "Correct ✅",
+        np.where((chosen != "") & has_key, "Incorrect ❌",
+                 np.where(~has_key, "No key ℹ️", "Unanswered ⚠️")))
     st.dataframe(review_df, use_container_width=True)
     st.download_button("⬇️ Download review (CSV)",
-                       data=review_df.to_csv(index=False).encode("utf-8-sig"),
+                       data=_review_csv_bytes((tuple(q_indices), tuple(chosen)), review_df),
                        file_name="quiz_review.csv", mime="text/csv")
 
     colA, colB = st.columns([1, 1])
@@ -374,6 +540,9 @@ def render_results():
         st.session_state.finished = False
         st.session_state.submitted = {}
         st.session_state.scored = set()
+        st.session_state._exam_scored = False
+        st.session_state._status_dirty = True  # old attempt's map symbols are stale now
+        st.session_state.pop("_radio_gid", None)  # reseed the radio on re-entry
         st.session_state.screen = "quiz"
         st.rerun()
 
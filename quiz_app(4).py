@@ -1,3 +1,4 @@
+import io
 import os
 import random
 import hashlib
@@ -5,6 +6,7 @@ import re
 from pathlib import Path
 
 import pandas as pd
+import requests
 import streamlit as st
 
 st.set_page_config(page_title="MCQ Quiz", layout="wide")
@@ -17,15 +19,18 @@ OPTION_LETTERS = ["A", "B", "C", "D", "E"]  # Support up to A–E
 # ==================================
 # Helpers
 # ==================================
-def available_options_for_row(row) -> list:
-    """Return the option letters that are non-empty for this row, in order."""
-    return [L for L in OPTION_LETTERS if str(row.get(L, "")).strip() != ""]
+def available_options_for_row(gid: int) -> list:
+    """Return the option letters that are non-empty for row gid, in order.
+
+    Reads one row of the has_opt boolean matrix built at load time instead of
+    stringifying and stripping five cells per call.
+    """
+    return [L for L, keep in zip(OPTION_LETTERS, df.attrs["has_opt"][gid]) if keep]
 
 
 def normalize_and_validate(df: pd.DataFrame) -> pd.DataFrame:
     """Normalize headers/values and ensure required columns exist (A–E supported)."""
-    def norm(s): return str(s).replace("\ufeff", "").strip()
-    df.columns = [norm(c) for c in df.columns]
+    df.columns = df.columns.astype(str).str.replace("\ufeff", "", regex=False).str.strip()
 
     # Core required columns
     required_core = ["No", "Question", "Correct"]
@@ -38,15 +43,20 @@ def normalize_and_validate(df: pd.DataFrame) -> pd.DataFrame:
         if col not in df.columns:
             df[col] = ""
 
-    # Clean values & trim whitespace
+    # Clean values & trim whitespace. Arrow-backed strings dispatch the \s+
+    # collapse and the trim to C kernels over contiguous buffers instead of a
+    # Python re call per cell (keep the pattern a plain string: a precompiled
+    # pattern forces pandas back off the Arrow path).
+    df = df.astype("string[pyarrow]").fillna("")
     for col in df.columns:
-        df[col] = df[col].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+        df[col] = df[col].str.replace(r"\s+", " ", regex=True).str.strip()
 
     # Drop blank questions
     df = df[df["Question"] != ""].copy()
 
     # Coerce Correct to A–E only (empty otherwise)
-    df["Correct"] = df["Correct"].str.upper().where(df["Correct"].str.upper().isin(OPTION_LETTERS), "")
+    u = df["Correct"].str.upper()  # upper-case once, not per comparison pass
+    df["Correct"] = u.where(u.isin(OPTION_LETTERS), "")
 
     # Reorder with a stable order: core, A–E, then extras
     ordered = required_core + OPTION_LETTERS
@@ -54,6 +64,12 @@ def normalize_and_validate(df: pd.DataFrame) -> pd.DataFrame:
     return df[ordered + extras].reset_index(drop=True)
 
 
+# Precompiled so each rerun reuses the patterns instead of recompiling them;
+# the conversion itself is two searches on a short string, cheap enough to
+# just run each time (an lru_cache here wouldn't outlive the rerun anyway)
+_SHEET_RE = re.compile(r"/spreadsheets/d/([^/]+)/")
+_GID_RE = re.compile(r"[?#&]gid=(\d+)")
+
 def _to_csv_url(u: str) -> str:
     """Leave 'published to web' CSV links alone; convert UI/view links to CSV export."""
     u = (u or "").strip()
@@ -62,8 +78,8 @@ def _to_csv_url(u: str) -> str:
         return u
     # Convert common view links to CSV export
     if "docs.google.com/spreadsheets" in u:
-        m = re.search(r"/spreadsheets/d/([^/]+)/", u)
-        gid_match = re.search(r"[?#&]gid=(\d+)", u)
+        m = _SHEET_RE.search(u)
+        gid_match = _GID_RE.search(u)
         if m:
             sheet_id = m.group(1)
             gid = gid_match.group(1) if gid_match else "0"
@@ -74,11 +90,42 @@ def _to_csv_url(u: str) -> str:
 # ==================================
 # Remote-only data loading
 # ==================================
-@st.cache_data(ttl=60)
+# {csv_url: (etag, last_modified, parsed df)} — lets the 60s refresh turn into
+# a conditional GET that reuses the parsed frame when the sheet is unchanged.
+# The dict lives behind cache_resource because Streamlit re-executes the
+# script in a fresh namespace each rerun, so a plain module global would be
+# empty again by the next refresh.
+@st.cache_resource(show_spinner=False)
+def _etag_store() -> dict:
+    return {}
+
+@st.cache_resource(ttl=60)
 def load_questions_remote(url: str):
-    """Load from Google Sheets CSV (published or export link). Auto-refresh every 60s."""
+    """Load from Google Sheets CSV (published or export link). Auto-refresh every 60s.
+
+    Cached as a shared resource (no pickle copy per rerun) — treat the
+    returned df as read-only.
+    """
     csv_url = _to_csv_url(url)
 
+    # Conditional GET: revalidate with the stored ETag/Last-Modified and keep
+    # the parsed frame on 304 — the old code re-downloaded the full CSV every
+    # refresh (once per parse trial, even)
+    headers = {}
+    etag_cache = _etag_store()
+    cached = etag_cache.get(csv_url)
+    if cached:
+        etag, last_mod, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_mod:
+            headers["If-Modified-Since"] = last_mod
+    resp = requests.get(csv_url, headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        return cached[2]
+    resp.raise_for_status()
+    raw = resp.content
+
     trials = [
         dict(encoding="utf-8-sig", sep=None, engine="python", on_bad_lines="skip"),
         dict(encoding="utf-8",     sep=None, engine="python", on_bad_lines="skip"),
@@ -88,10 +135,15 @@ def load_questions_remote(url: str):
     last_err = None
     for opts in trials:
         try:
-            df = pd.read_csv(csv_url, dtype=str, **opts).fillna("")
+            df = pd.read_csv(io.BytesIO(raw), dtype=str, **opts).fillna("")
             df = normalize_and_validate(df)
             if len(df) == 0 or "Question" not in df.columns:
                 raise ValueError("Downloaded file has no rows or missing required columns.")
+            # Option presence as one (total × 5) boolean matrix; values are
+            # already trimmed, so a vectorized != "" is enough
+            df.attrs["has_opt"] = df[OPTION_LETTERS].to_numpy(dtype=str) != ""
+            etag_cache[csv_url] = (resp.headers.get("ETag", ""),
+                                   resp.headers.get("Last-Modified", ""), df)
             return df
         except Exception as e:
             last_err = e
@@ -144,9 +196,7 @@ def init_quiz(mode: str, num_questions: int, shuffle_questions: bool, shuffle_op
     # Per-question answer order (non-empty options), optionally shuffled
     opt_order = {}
     for gid in q_indices:
-        row = df.iloc[gid]
-        letters = available_options_for_row(row)  # dynamic A–E
-        order = letters[:]
+        order = available_options_for_row(gid)  # dynamic A–E
         if shuffle_options and len(order) > 1:
             random.shuffle(order)
         opt_order[gid] = order
@@ -180,17 +230,21 @@ def go_next():
 
 
 def go_prev():
-    st.session_state.idx = max(0, st.session_state.idx - 1)
-    st.rerun()
+    new_idx = max(0, st.session_state.idx - 1)
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
 
 def jump_to(local_idx: int):
-    st.session_state.idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
-    st.rerun()
+    new_idx = max(0, min(local_idx, len(st.session_state.q_indices) - 1))
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
 
 def render_options(gid, row):
-    order = st.session_state.opt_order.get(gid, available_options_for_row(row))
+    order = st.session_state.opt_order.get(gid, available_options_for_row(gid))
     labels = [f"{L}. {row[L]}" for L in order]
     return order, labels
 
@@ -285,27 +339,37 @@ def render_quiz():
     gid = st.session_state.q_indices[st.session_state.idx]
     row = df.iloc[gid]
     st.markdown(f"### {row['Question']}")
-    active_letters = " / ".join(available_options_for_row(row))
+    active_letters = " / ".join(available_options_for_row(gid))
     st.caption(f"Options: {active_letters}")
 
     order, labels = render_options(gid, row)
 
     # Flag/Unflag
+    # Flag/Unflag — stable key + on_click so the widget node survives Next/Previous
+    def _toggle_flag(g=gid):
+        if g in st.session_state.flags: st.session_state.flags.discard(g)
+        else: st.session_state.flags.add(g)
+
     flag_col, _ = st.columns([1, 3])
     flagged = gid in st.session_state.flags
-    if flag_col.button("Unflag ⚑" if flagged else "Flag ⚑", key=f"flag_{gid}"):
-        if flagged: st.session_state.flags.discard(gid)
-        else: st.session_state.flags.add(gid)
-        st.rerun()
+    flag_col.button("Unflag ⚑" if flagged else "Flag ⚑", key="flag_btn", on_click=_toggle_flag)
 
-    # Answer form
-    with st.form(key=f"form_{gid}"):
+    # Answer form — stable keys: per-gid keys made Streamlit discard and
+    # rebuild the widget tree on every question change. Seed the radio
+    # only when the displayed question changes — an unconditional write here
+    # clobbers the value the form just committed on the submit rerun.
+    if st.session_state.get("_radio_gid") != gid:
         prev_choice = st.session_state.answers.get(gid, None)
-        prev_index = order.index(prev_choice) if prev_choice in order else None
+        try:  # one scan instead of `in` + .index
+            st.session_state["answer_radio"] = order.index(prev_choice)
+        except ValueError:
+            st.session_state["answer_radio"] = None
+        st.session_state["_radio_gid"] = gid
+    with st.form(key="answer_form"):
         choice_idx = st.radio("Select your answer:",
                               options=list(range(len(labels))),
                               format_func=lambda i: labels[i],
-                              index=prev_index)
+                              key="answer_radio")
 
         submit_label = "Check Answer ✅" if st.session_state.mode.startswith("Practice") else "Save Answer 💾"
         submitted = st.form_submit_button(submit_label, use_container_width=True)
@@ -398,6 +462,7 @@ def render_results():
         st.session_state.finished = False
         st.session_state.submitted = {}
         st.session_state.scored = set()
+        st.session_state.pop("_radio_gid", None)  # reseed the radio on re-entry
         st.session_state.screen = "quiz"
         st.rerun()
 
@@ -1,22 +1,46 @@
 
 import os
-import random
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
 st.set_page_config(page_title="MCQ Quiz", layout="wide")
 
+REQUIRED = ["No", "Question", "A", "B", "C", "D", "Correct"]
+_REQUIRED_SET = frozenset(REQUIRED)
+
+def _keep_col(name) -> bool:
+    """usecols filter: skip columns the app never reads at the parser level."""
+    return str(name).replace("\ufeff", "").strip() in _REQUIRED_SET
+
+def file_signature(base_name="questions"):
+    """Name + mtime + size from one stat() call — cheap cache-buster for load_questions."""
+    p = Path(base_name)
+    candidate = p.with_suffix(".csv") if p.with_suffix(".csv").exists() else p.with_suffix(".xlsx")
+    if not candidate.exists():
+        return "nofile"
+    s = candidate.stat()
+    return f"{candidate.name}:{s.st_mtime_ns}:{s.st_size}"
+
+def _detect_sep(path: Path) -> bytes:
+    """Pick the delimiter by frequency in the first line — beats sniffing the whole file."""
+    with open(path, "rb") as f:
+        head = f.readline()
+    return max([b",", b";", b"\t", b"|"], key=head.count)
+
 # =========================
 # Data Loading
 # =========================
-@st.cache_data
-def load_questions(base_name: str = "questions"):
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_questions(base_name: str = "questions", sig: str = ""):
     """
     Loads questions from CSV (preferred) or XLSX (fallback).
     Expected columns: No, Question, A, B, C, D, Correct
     Returns a dataframe with those columns, all strings, trimmed.
+    'sig' is a cache-buster from file_signature(), so an edited file is
+    picked up on the next rerun instead of waiting out the ttl.
     """
     p = Path(base_name)
     csv_path = p.with_suffix(".csv")
@@ -25,16 +49,15 @@ def load_questions(base_name: str = "questions"):
     df = None
     errors = []
 
-    # Try CSV with tolerant settings
+    # Try CSV first with the fast C engine and an explicit separator; keep the
+    # slow sep-sniffing python engine only as a fallback
     if csv_path.exists():
-        trials = [
-            dict(encoding="utf-8-sig", sep=None, engine="python"),
-            dict(encoding="utf-8", sep=None, engine="python"),
-            dict(encoding="latin1", sep=None, engine="python"),
-        ]
-        for t in trials:
+        sep = _detect_sep(csv_path).decode()
+        for t in (dict(encoding="utf-8-sig", sep=sep, engine="c"),
+                  dict(encoding="utf-8-sig", sep=None, engine="python"),
+                  dict(encoding="latin1", sep=None, engine="python")):
             try:
-                df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", **t)
+                df = pd.read_csv(csv_path, dtype=str, on_bad_lines="skip", usecols=_keep_col, **t)
                 break
             except Exception as e:
                 errors.append(f"CSV read failed ({t}): {type(e).__name__}: {e}")
@@ -42,7 +65,7 @@ def load_questions(base_name: str = "questions"):
     # Fallback: Excel
     if df is None and xlsx_path.exists():
         try:
-            df = pd.read_excel(xlsx_path, dtype=str)
+            df = pd.read_excel(xlsx_path, dtype=str, usecols=_keep_col)
         except Exception as e:
             errors.append(f"Excel read failed: {type(e).__name__}: {e}")
 
@@ -60,21 +83,31 @@ def load_questions(base_name: str = "questions"):
     df.columns = [norm(c) for c in df.columns]
 
     # Ensure required columns exist
-    required = ["No","Question","A","B","C","D","Correct"]
-    for col in required:
+    for col in REQUIRED:
         if col not in df.columns:
             df[col] = ""
 
-    df = df[required].fillna("")
-    for col in required:
-        df[col] = df[col].astype(str).str.strip()
+    # Trim on Arrow-backed strings: one C kernel pass per column instead of
+    # two fresh object arrays from astype(str) + str.strip
+    df = df[REQUIRED].astype("string[pyarrow]").fillna("")
+    for col in REQUIRED:
+        df[col] = df[col].str.strip()
 
     # Drop rows with no question text
     df = df[df["Question"] != ""]
     df = df.reset_index(drop=True)
+
+    # Render-path caches: the options as an ndarray matrix and the full rows
+    # as plain tuples — both avoid boxing a pandas Series per rerun
+    df.attrs["options_matrix"] = df[["A", "B", "C", "D"]].to_numpy()
+    # Bit i of opt_mask[row] = option "ABCD"[i] is non-empty (values are
+    # already stripped); presence checks become one byte load + bit tests
+    df.attrs["opt_mask"] = np.packbits(
+        (df.attrs["options_matrix"] != "").astype(np.uint8), axis=1, bitorder="little").ravel()
+    df.attrs["rows_tup"] = tuple(df.itertuples(index=False, name=None))
     return df
 
-df = load_questions("questions")
+df = load_questions("questions", file_signature("questions"))
 
 # =========================
 # Helpers & State
@@ -83,16 +116,19 @@ def init_quiz(mode: str, num_questions: int, shuffle: bool):
     total = len(df)
     num_questions = max(1, min(num_questions, total))
 
-    q_indices = list(range(total))
+    # Sample question ids in C instead of shuffling a size-total Python list
+    rng = np.random.default_rng()
     if shuffle:
-        random.seed()  # new shuffle per run
-        random.shuffle(q_indices)
-    q_indices = q_indices[:num_questions]
+        q_indices = rng.choice(total, size=num_questions, replace=False)
+    else:
+        q_indices = np.arange(num_questions)
 
     st.session_state.q_indices = q_indices
     st.session_state.idx = 0
-    st.session_state.answers = {}     # {global_idx: "A"/"B"/"C"/"D"}
-    st.session_state.correct_map = {i: (df.iloc[i]["Correct"] or "").strip().upper() for i in q_indices}
+    # Aligned answer/key arrays indexed by global position — exam scoring and
+    # the review table become single vectorized compares instead of dict loops
+    st.session_state.answers = np.full(total, "", dtype="U1")  # chosen letter, "" = unanswered
+    st.session_state.correct_arr = df["Correct"].str.upper().to_numpy(dtype="U1")
     st.session_state.score = 0
     st.session_state.finished = False
     st.session_state.mode = mode
@@ -100,6 +136,7 @@ def init_quiz(mode: str, num_questions: int, shuffle: bool):
     st.session_state.submitted = {}   # {global_idx: bool} for practice flow
     st.session_state.scored = set()   # which have already incremented score in practice
     st.session_state.flags = set()    # flagged questions (global idx)
+    st.session_state.status_arr = np.zeros(len(q_indices), np.uint8)  # status bits per local position
 
 def go_home():
     st.session_state.screen = "home"
@@ -113,49 +150,48 @@ def go_next():
     st.rerun()
 
 def go_prev():
-    st.session_state.idx = max(0, st.session_state.idx - 1)
-    st.rerun()
+    new_idx = max(0, st.session_state.idx - 1)
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
 def jump_to(local_idx: int):
-    st.session_state.idx = max(0, min(local_idx, len(st.session_state.q_indices)-1))
-    st.rerun()
+    new_idx = max(0, min(local_idx, len(st.session_state.q_indices)-1))
+    if new_idx != st.session_state.idx:
+        st.session_state.idx = new_idx
+        st.rerun()
 
-def render_question_row(row):
-    options = [("A", row["A"]), ("B", row["B"]), ("C", row["C"]), ("D", row["D"])]
-    options = [(k, v) for k, v in options if str(v).strip() != ""]
+def render_question_row(global_idx: int):
+    row = df.attrs["options_matrix"][global_idx]
+    m = df.attrs["opt_mask"][global_idx]
+    options = [(k, row[i]) for i, k in enumerate("ABCD") if m >> i & 1]
     labels = [f"{k}. {v}" for k, v in options]
     keys = [k for k,_ in options]
     return keys, labels
 
-def status_for(local_idx: int):
-    """Return (symbol, help_text) for the question in the session set at position local_idx."""
-    global_idx = st.session_state.q_indices[local_idx]
-    flagged = global_idx in st.session_state.flags
-    answered = global_idx in st.session_state.answers
-
-    if st.session_state.mode.startswith("Practice"):
-        submitted = st.session_state.submitted.get(global_idx, False)
-        if submitted:
-            chosen = st.session_state.answers.get(global_idx, "")
-            correct = st.session_state.correct_map.get(global_idx, "")
-            if correct and chosen == correct:
-                sym = "✅"  # correct (checked)
-                hint = "Answered & correct"
-            else:
-                sym = "❌"  # incorrect (checked)
-                hint = "Answered & incorrect"
+# Per-question status bits, kept in a uint8 array updated at the point each
+# event happens, so the question map reads one array slot per cell instead of
+# re-deriving status from four dict/set lookups on every rerun.
+FLAGGED, ANSWERED, SUBMITTED, CORRECT = 1, 2, 4, 8
+
+def _status_tables(practice: bool):
+    """Precompute (symbol, hint) for all 16 bit combinations."""
+    syms, hints = [], []
+    for bits in range(16):
+        if bits & SUBMITTED:
+            sym, hint = ("✅", "Answered & correct") if bits & CORRECT else ("❌", "Answered & incorrect")
+        elif bits & ANSWERED:
+            sym, hint = "•", ("Answered (not checked)" if practice else "Answered")
         else:
-            sym = "•" if answered else "◻️"
-            hint = "Answered (not checked)" if answered else "Not answered"
-    else:
-        sym = "•" if answered else "◻️"
-        hint = "Answered" if answered else "Not answered"
+            sym, hint = "◻️", "Not answered"
+        if bits & FLAGGED:
+            sym, hint = "⚑" + sym, "Flagged • " + hint
+        syms.append(sym)
+        hints.append(hint)
+    return tuple(syms), tuple(hints)
 
-    if flagged:
-        # Prepend flag symbol
-        sym = f"⚑{sym}"
-        hint = "Flagged • " + hint
-    return sym, hint
+_PRACTICE_SYMS, _PRACTICE_HINTS = _status_tables(True)
+_EXAM_SYMS, _EXAM_HINTS = _status_tables(False)
 
 # =========================
 # Screens
@@ -188,24 +224,40 @@ def render_home():
         init_quiz(mode, int(num_questions), shuffle)
         st.rerun()
 
+@st.cache_data(show_spinner=False)
+def _render_map_html(status_bytes: bytes, practice: bool) -> str:
+    """Build the whole map as one HTML grid, memoized on the raw status bytes."""
+    syms, hints = (_PRACTICE_SYMS, _PRACTICE_HINTS) if practice else (_EXAM_SYMS, _EXAM_HINTS)
+    cells = "".join(
+        f'<span class="qmap-cell" title="{hints[b]}">{i+1}<br>{syms[b]}</span>'
+        for i, b in enumerate(status_bytes)
+    )
+    return (
+        '<style>.qmap{display:grid;grid-template-columns:repeat(12,1fr);gap:4px}'
+        '.qmap-cell{border:1px solid #ddd;border-radius:4px;padding:2px;'
+        'text-align:center;font-size:0.8em}</style>'
+        f'<div class="qmap">{cells}</div>'
+    )
+
 def render_question_map():
     st.markdown("##### Question Map")
     # Legend
     st.caption("Legend: ⚑ flagged • ✅ correct (practice) • ❌ incorrect (practice) • • answered • ◻️ not answered")
     n = len(st.session_state.q_indices)
-    COLS = 12
-    rows = (n + COLS - 1) // COLS
-    for r in range(rows):
-        cols = st.columns(COLS)
-        for c in range(COLS):
-            i = r*COLS + c
-            if i >= n:
-                continue
-            sym, hint = status_for(i)
-            label = f"{i+1}\n{sym}"
-            # Use a compact button; key must be unique
-            if cols[c].button(label, key=f"jump_{i}", help=hint):
-                jump_to(i)
+    # One markdown element instead of N st.button widgets — Streamlit's
+    # protobuf round-trip scales with widget count, which dominated large
+    # sessions. The status array's bytes key the cached HTML, so an unchanged
+    # map costs one cache hit. (?jump= anchor links would reload the page and
+    # drop the session, so navigation goes through the jump control below.)
+    practice = st.session_state.mode.startswith("Practice")
+    st.markdown(_render_map_html(st.session_state.status_arr.tobytes(), practice),
+                unsafe_allow_html=True)
+
+    jump_col, go_col = st.columns([3, 1])
+    target = jump_col.number_input("Jump to question", min_value=1, max_value=n,
+                                   value=st.session_state.idx + 1, step=1)
+    if go_col.button("Go", key="jump_go", use_container_width=True):
+        jump_to(int(target) - 1)
 
 def render_quiz():
     # Header with progress + map
@@ -227,32 +279,41 @@ def render_quiz():
 
     # Current question
     cur_global_idx = st.session_state.q_indices[st.session_state.idx]
-    row = df.iloc[cur_global_idx]
-    st.markdown(f"### {row['Question']}")
+    st.markdown(f"### {df.attrs['rows_tup'][cur_global_idx][1]}")  # [1] = Question
 
-    keys, labels = render_question_row(row)
+    keys, labels = render_question_row(cur_global_idx)
+
+    # Flag / Unflag control — stable key + on_click so the node survives navigation
+    def _toggle_flag(g=cur_global_idx):
+        if g in st.session_state.flags:
+            st.session_state.flags.discard(g)
+        else:
+            st.session_state.flags.add(g)
+        st.session_state.status_arr[st.session_state.idx] ^= FLAGGED
 
-    # Flag / Unflag control
     flag_col, _ = st.columns([1,3])
     flagged = cur_global_idx in st.session_state.flags
     flag_label = "Unflag ⚑" if flagged else "Flag ⚑"
-    if flag_col.button(flag_label, key=f"flag_{cur_global_idx}"):
-        if flagged:
-            st.session_state.flags.discard(cur_global_idx)
-        else:
-            st.session_state.flags.add(cur_global_idx)
-        st.rerun()
+    flag_col.button(flag_label, key="flag_btn", on_click=_toggle_flag)
 
     # Form: in Practice -> Check (no auto-advance). In Exam -> Save & Next.
-    with st.form(key=f"form_{cur_global_idx}"):
-        prev_choice = st.session_state.answers.get(cur_global_idx, None)
-        prev_index = keys.index(prev_choice) if prev_choice in keys else None
-
+    # Stable keys: per-question keys made Streamlit rebuild the whole widget
+    # tree on every navigation instead of diffing the existing one. Seed the radio
+    # only when the displayed question changes — an unconditional write here
+    # clobbers the value the form just committed on the submit rerun.
+    if st.session_state.get("_radio_gid") != cur_global_idx:
+        prev_choice = st.session_state.answers[cur_global_idx] or None
+        try:  # one scan instead of `in` + .index
+            st.session_state["answer_radio"] = keys.index(prev_choice)
+        except ValueError:
+            st.session_state["answer_radio"] = None
+        st.session_state["_radio_gid"] = cur_global_idx
+    with st.form(key="answer_form"):
         choice_idx = st.radio(
             "Select your answer:",
             options=list(range(len(labels))),
             format_func=lambda i: labels[i],
-            index=prev_index
+            key="answer_radio"
         )
 
         submit_label = "Check Answer ✅" if st.session_state.mode.startswith("Practice") else "Save Answer 💾"
@@ -265,9 +326,19 @@ def render_quiz():
         chosen_letter = keys[choice_idx]
         st.session_state.answers[cur_global_idx] = chosen_letter
 
-        if st.session_state.mode.startswith("Practice"):
+        correct_letter = st.session_state.correct_arr[cur_global_idx]
+        practice = st.session_state.mode.startswith("Practice")
+        new_bits = ANSWERED
+        if practice:
             st.session_state.submitted[cur_global_idx] = True
-            correct_letter = st.session_state.correct_map.get(cur_global_idx, "")
+            new_bits |= SUBMITTED
+            if correct_letter and chosen_letter == correct_letter:
+                new_bits |= CORRECT
+        # Only this question's slot changes; its flag bit is preserved
+        i = st.session_state.idx
+        st.session_state.status_arr[i] = (st.session_state.status_arr[i] & FLAGGED) | new_bits
+
+        if practice:
             if correct_letter and chosen_letter == correct_letter:
                 st.success(f"✅ Correct! ({chosen_letter})")
                 if cur_global_idx not in st.session_state.scored:
@@ -298,38 +369,37 @@ def render_quiz():
     if navR.button("Next ▶", use_container_width=True, disabled=disable_next, help=help_txt):
         go_next()
 
+_STATUS_LABELS = np.array(["Correct ✅", "Incorrect ❌", "No key ℹ️", "Unanswered ⚠️"])
+
+def _compute_status(chosen_arr, correct_arr):
+    """Vectorized status codes (indices into _STATUS_LABELS) for the results screen."""
+    has_key = correct_arr != ""
+    match = has_key & (chosen_arr == correct_arr)
+    return np.where(match, 0,
+                    np.where((chosen_arr != "") & has_key, 1,
+                             np.where(~has_key, 2, 3)))
+
 def render_results():
     st.header("📊 Results")
     total = len(st.session_state.q_indices)
 
+    qi = st.session_state.q_indices
+    chosen = st.session_state.answers[qi]
+    correct = st.session_state.correct_arr[qi]
+    # One status pass feeds both the exam score and the review labels
+    status_codes = _compute_status(chosen, correct)
+
     if st.session_state.mode.startswith("Exam"):
-        # Compute score now
-        score = 0
-        for i in st.session_state.q_indices:
-            chosen = st.session_state.answers.get(i, "")
-            correct = st.session_state.correct_map.get(i, "").upper()
-            if correct and chosen == correct:
-                score += 1
-        st.session_state.score = score
+        st.session_state.score = int((status_codes == 0).sum())
 
     st.metric("Score", f"{st.session_state.score} / {total}")
 
-    # Review table
-    rows = []
-    for i in st.session_state.q_indices:
-        q = df.iloc[i]
-        chosen = st.session_state.answers.get(i, "")
-        correct = st.session_state.correct_map.get(i, "").upper()
-        status = ("Correct ✅" if correct and chosen == correct else
-                  ("Incorrect ❌" if chosen and correct else
-                   ("No key ℹ️" if not correct else "Unanswered ⚠️")))
-        rows.append({
-            "No": q["No"],
-            "Question": q["Question"],
-            "A": q["A"], "B": q["B"], "C": q["C"], "D": q["D"],
-            "Chosen": chosen, "Correct": correct, "Status": status
-        })
-    review_df = pd.DataFrame(rows)
+    # Review table — one vectorized slice instead of a per-row Python loop
+    review_df = df.iloc[qi][["No", "Question", "A", "B", "C", "D"]].reset_index(drop=True)
+    review_df.attrs = {}  # drop render caches inherited from df; they don't serialize to the frontend
+    review_df["Chosen"] = chosen
+    review_df["Correct"] = correct
+    review_df["Status"] = _STATUS_LABELS[status_codes]
     st.dataframe(review_df, use_container_width=True)
     st.download_button("⬇️ Download review (CSV)",
                        data=review_df.to_csv(index=False).encode("utf-8-sig"),
@@ -342,11 +412,13 @@ def render_results():
         st.rerun()
     if colB.button("🔁 Restart same settings"):
         st.session_state.idx = 0
-        st.session_state.answers = {}
+        st.session_state.answers[:] = ""
         st.session_state.score = 0
         st.session_state.finished = False
         st.session_state.submitted = {}
         st.session_state.scored = set()
+        st.session_state.status_arr &= FLAGGED  # keep flags, clear answer bits
+        st.session_state.pop("_radio_gid", None)  # reseed the radio on re-entry
         st.session_state.screen = "quiz"
         st.rerun()
 